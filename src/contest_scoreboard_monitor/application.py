@@ -1,19 +1,25 @@
 import asyncio
 import logging
+import subprocess
 import threading
+from collections import deque
 from datetime import datetime
 from tkinter import scrolledtext
-from typing import Dict, List, Optional, Any
+from typing import Dict, FrozenSet, List, Optional, Any
 
-import aiohttp
 import customtkinter as ctk
 
+from src.contest_scoreboard_monitor.callsign_registry import callsigns
 from src.contest_scoreboard_monitor.category import Category
 from src.contest_scoreboard_monitor.contest import Contest
 from src.contest_scoreboard_monitor.find_font import find_font
-from src.contest_scoreboard_monitor.inpersonate import inpersonate_browser_headers
-from src.contest_scoreboard_monitor.stations_list import StationsList
-from src.contest_scoreboard_monitor.userconfig import get_config_value, set_config_value
+from src.contest_scoreboard_monitor.geo_index import AREAS, AREA_ALL, WAZ, GeoIndex
+from src.contest_scoreboard_monitor.log import ring_buffer, shutdown_logging
+from src.contest_scoreboard_monitor.rules import Alert, RuleEngine, compile_rules
+from src.contest_scoreboard_monitor.transfer import PayloadTransfer, CACHE_DIR
+from src.contest_scoreboard_monitor.ui_dispatcher import UiDispatcher
+from src.contest_scoreboard_monitor.userconfig import get_config_value, get_config_section, set_config_value
+from src.contest_scoreboard_monitor.watcher import ContestWatch, ContestWatcher
 
 
 class Application:
@@ -25,19 +31,23 @@ class Application:
         self.stations_var = ctk.StringVar(value=get_config_value("Settings", "stations", "10"))
         self.zone_var = ctk.StringVar(value=get_config_value("Settings", "zone", "14 15"))
         self.include_var = ctk.StringVar(value=get_config_value("Settings", "include", ""))
+        self.area_var = ctk.StringVar(value=get_config_value("Settings", "area", AREA_ALL))
+        self.radius_var = ctk.StringVar(value=get_config_value("Settings", "radius_km", "1000"))
         self.status_var = ctk.StringVar(value="Ready to start monitoring")
+        self.alert_var = ctk.StringVar(value="")
+        self.recent_alerts: deque = deque(maxlen=5)
+        self.alert_hook = get_config_value("Settings", "alert_hook", "")
 
-        self.include_callsigns: List[str] = []
-        self.include_zones: List[int] = []
-        self.stations = StationsList()
         self.contests: List[Contest] = []
         self.categories: List[Category] = []
-        self.current_monitor_task: Optional[asyncio.Task] = None
-        self.is_monitoring = False
+        self.transfer = PayloadTransfer(get_config_value("Settings", "cache_dir", CACHE_DIR))
+        self.watcher: Optional[ContestWatcher] = None
+        self.active_contest_id: Optional[int] = None
 
         self.root = root
         self.root.title("ON4FF Contest Scoreboard Monitor")
         self.root.geometry("1500x700")
+        self.ui = UiDispatcher(self.root, int(get_config_value("Settings", "frame_budget_ms", "100")))
 
         ctk.set_appearance_mode("Light")
         ctk.set_default_color_theme("blue")
@@ -53,6 +63,8 @@ class Application:
 
         self.thread = None
         self.loop = asyncio.new_event_loop()
+        self.watcher = ContestWatcher(self.loop, self.fetch_json, self.on_contest_data,
+                                      resume=self.transfer.load_cached, interval=self.update_interval)
         self.start_async_tasks()
 
     def setup_ui(self):
@@ -83,6 +95,15 @@ class Application:
         zone_entry.pack(side="left", padx=5)
         zone_entry.configure(validatecommand=(self.root.register(Application.validate_zones), '%P'))
 
+        # area relative to the first include callsign
+        ctk.CTkLabel(frame1, text="Area:").pack(side="left", padx=(5, 0))
+        ctk.CTkComboBox(frame1, variable=self.area_var, values=AREAS, state="readonly", width=150).pack(side="left", padx=5)
+
+        ctk.CTkLabel(frame1, text="km:").pack(side="left", padx=(5, 0))
+        radius_entry = ctk.CTkEntry(frame1, textvariable=self.radius_var, width=60, validate="key")
+        radius_entry.pack(side="left", padx=5)
+        radius_entry.configure(validatecommand=(self.root.register(Application.validate_number), '%P'))
+
         self.start_button = ctk.CTkButton(self.line1_frame, text="START", command=self.toggle_monitoring,
                                           fg_color="#2E7D32", hover_color="#1B5E20")
         self.start_button.pack(side="right", padx=20, pady=0)
@@ -96,6 +117,8 @@ class Application:
         # include_entry must be in uppercase
         include_entry.bind("<KeyRelease>", lambda event: self.include_var.set(self.include_var.get().upper()))
 
+        ctk.CTkButton(self.line2_frame, text="LOG", width=50, command=self.show_log).pack(side="right", padx=20)
+
         status_label = ctk.CTkLabel(
             self.line2_frame,
             textvariable=self.status_var,
@@ -104,6 +127,14 @@ class Application:
         )
         status_label.pack(side="left", padx=5, pady=0)
 
+        alert_label = ctk.CTkLabel(
+            self.line2_frame,
+            textvariable=self.alert_var,
+            text_color="#D32F2F",
+            bg_color="transparent"
+        )
+        alert_label.pack(side="left", padx=5, pady=0)
+
         # Results frame with text widget
         results_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
         results_frame.pack(fill="both", expand=True, pady=0)
@@ -148,8 +179,19 @@ class Application:
         logging.debug("Contest selected: %s", selected_name)
         contest = next((c for c in self.contests if f"{c.name} ({c.testid})" == selected_name), None)
         if contest:
-            self.status_var.set(f"Selected: {contest.name} (ID: {contest.testid})")
-            asyncio.run_coroutine_threadsafe(self.load_categories(contest.testid), self.loop)
+            watch = self.watcher.get(contest.testid)
+            if watch:
+                # already watched in the background, switch to its scoreboard right away
+                self.active_contest_id = contest.testid
+                self.update_stations_display()
+                self.update_status(f"Monitoring: {contest.name} (ID: {contest.testid})")
+            else:
+                self.active_contest_id = None
+                self.clear_stations_display()
+                self.update_status(f"Selected: {contest.name} (ID: {contest.testid})")
+            self.update_controls()
+            selected_category = f"{watch.category.categoryname} ({watch.category.catid})" if watch else None
+            asyncio.run_coroutine_threadsafe(self.load_categories(contest.testid, selected_category), self.loop)
 
     def get_selected_contest_id(self) -> Optional[int]:
         selected_name = self.contest_var.get()
@@ -171,7 +213,9 @@ class Application:
         for widgets in self.line1_frame.winfo_children():
             if widgets != self.start_button:
                 for child in widgets.winfo_children():
-                    child.configure(state=state)
+                    # keep the contest selectable to switch between watched contests
+                    if child != self.contest_dropdown:
+                        child.configure(state=state)
         for widgets in self.line2_frame.winfo_children():
             # if widget type is label, skip
             if isinstance(widgets, ctk.CTkLabel):
@@ -179,8 +223,16 @@ class Application:
             for child in widgets.winfo_children():
                 child.configure(state=state)
 
+    def update_controls(self):
+        if self.watcher.is_watching(self.get_selected_contest_id()):
+            self.start_button.configure(text="STOP", fg_color="#D32F2F", hover_color="#B71C1C")
+            self.enable_widgets(False)
+        else:
+            self.start_button.configure(text="START MONITORING", fg_color="#2E7D32", hover_color="#1B5E20")
+            self.enable_widgets(True)
+
     def toggle_monitoring(self):
-        if not self.is_monitoring:
+        if not self.watcher.is_watching(self.get_selected_contest_id()):
             self.start_monitoring()
         else:
             self.stop_monitoring()
@@ -188,40 +240,50 @@ class Application:
     def start_monitoring(self):
         contest_id = self.get_selected_contest_id()
         if not contest_id:
-            self.status_var.set("Error: Please select a contest first")
+            self.update_status("Error: Please select a contest first")
             return
 
         logging.debug("Starting monitoring contest ID %d top %s stations", contest_id, self.stations_var.get())
-        self.is_monitoring = True
-        self.start_button.configure(text="STOP", fg_color="#D32F2F", hover_color="#B71C1C")
-        self.enable_widgets(False)
-        self.status_var.set(f"Monitoring contest {contest_id}...")
-
-        # Start async monitoring task
-        self.stations.clear()
-        asyncio.run_coroutine_threadsafe(self.monitor_contest(contest_id), self.loop)
+        include_callsigns = [cs for cs in self.include_var.get().split(" ") if cs.strip()]
+        watch = ContestWatch(
+            contest_id=contest_id,
+            category=self.get_selected_category(),
+            include_zones=frozenset(int(z.strip()) for z in self.zone_var.get().split(" ") if z.strip().isdigit()),
+            include_ids=frozenset(callsigns.id_for(cs) for cs in include_callsigns),
+            max_stations=int(self.stations_var.get() or "99999"),
+            area=self.area_var.get(),
+            home_id=callsigns.id_for(include_callsigns[0]) if include_callsigns else None,
+            radius_km=int(self.radius_var.get() or "0"),
+        )
+        watch.rules = RuleEngine(compile_rules(get_config_section("Rules")), watch.home_id)
+        logging.debug("Alert rules: %s", [str(r) for r in watch.rules.rules])
+        if watch.area != AREA_ALL and watch.home_id is None:
+            logging.warning("Area %s needs an include callsign as home station, showing all areas", watch.area)
+        logging.debug("Include zones: %s", watch.include_zones)
+        logging.debug("Include callsigns: %s", [callsigns.sign_for(i) for i in watch.include_ids])
+
+        self.active_contest_id = contest_id
+        self.watcher.add(watch)
+        self.update_controls()
+        self.update_status(f"Monitoring contest {contest_id}...")
 
     def stop_monitoring(self):
-        logging.debug("Stopping monitoring")
-        self.is_monitoring = False
-        self.start_button.configure(text="START MONITORING", fg_color="#2E7D32", hover_color="#1B5E20")
-        self.enable_widgets(True)
-        self.status_var.set("Monitoring stopped")
-
-        if self.current_monitor_task:
-            self.current_monitor_task.cancel()
+        contest_id = self.get_selected_contest_id()
+        logging.debug("Stopping monitoring contest ID %s", contest_id)
+        self.watcher.remove(contest_id)
+        if contest_id == self.active_contest_id:
+            self.active_contest_id = None
+            self.clear_stations_display()
+        self.update_controls()
+        self.update_status("Monitoring stopped")
 
     async def fetch_json(self, url: str) -> Optional[list[Dict[str, Any]]]:
         logging.debug("Fetching JSON data from URL: %s", url)
         try:
-            connector = aiohttp.TCPConnector(ssl=False)
-            headers = inpersonate_browser_headers()
-
-            async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
-                async with session.get(url, timeout=30) as response:
-                    response.raise_for_status()
-                    return await response.json()
+            return await self.transfer.fetch_json(url)
         except Exception as e:
+            # repeated failures are rate limited by the logging setup
+            logging.error("Error fetching %s: %s", url, e)
             self.update_status(f"API Error: {str(e)}")
             return None
 
@@ -247,15 +309,14 @@ class Application:
                     logging.debug("Loaded contest: %s", contest)
 
             contest_names = [f"{c.name} ({c.testid})" for c in self.contests]
-            self.root.after(0, lambda: self.contest_dropdown.configure(values=contest_names))
+            self.ui.post("contests", lambda: self.set_dropdown(self.contest_dropdown, contest_names))
 
             if contest_names:
-                self.root.after(0, lambda: self.contest_dropdown.set(contest_names[0]))
                 first_contest_testid = self.contests[0].testid
                 asyncio.run_coroutine_threadsafe(self.load_categories(first_contest_testid), self.loop)
                 self.update_status(f"Loaded {len(contest_names)} contests")
 
-    async def load_categories(self, contest_id: int):
+    async def load_categories(self, contest_id: int, selected: Optional[str] = None):
         data = await self.fetch_json(f"https://contest.run/api/category/contest/{contest_id}")
         logging.debug("Received data for %d categories.", len(data) if data else 0)
 
@@ -294,73 +355,107 @@ class Application:
                 for item in data
                 if item.get('catid')
             ]
-            for category in self.categories:
-                logging.debug("Loaded category: %s", category)
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                for category in self.categories:
+                    logging.debug("Loaded category: %s", category)
 
             category_names = [f"{c.categoryname} ({c.catid})" for c in self.categories]
-            self.root.after(0, lambda: self.entry_select.configure(values=category_names))
+            self.ui.post("categories", lambda: self.set_dropdown(self.entry_select, category_names, selected))
 
             if category_names:
-                self.root.after(0, lambda: self.entry_select.set(category_names[0]))
                 self.update_status(f"Loaded {len(category_names)} categories")
 
-    async def monitor_contest(self, contest_id: int):
-        """Monitor contest data periodically"""
-        self.current_monitor_task = asyncio.current_task()
-
-        url = f"https://contest.run/api/displayscore/{contest_id}"
-        logging.debug("Starting monitoring for contest ID %d at URL: %s", contest_id, url)
-
-        self.include_zones = [int(z.strip()) for z in self.zone_var.get().split(" ") if z.strip().isdigit()]
-        logging.debug("Include zones: %s", self.include_zones)
-
-        self.include_callsigns = [cs.strip().upper() for cs in self.include_var.get().split(" ") if cs.strip()]
-        logging.debug("Include callsigns: %s", self.include_callsigns)
-
-        while self.is_monitoring:
-            try:
-                data = await self.fetch_json(url=url)
-                logging.debug("Received data for %d entries.", len(data) if data else 0)
-                if data:
-                    self.process_contest_data(data)
-                    self.update_status(f"Last updated: {datetime.now().strftime('%H:%M:%S')} ({len(data)})")
-
-                await asyncio.sleep(self.update_interval)
-
-            except asyncio.CancelledError:
-                logging.debug("async cancelled error caught, stopping monitoring loop")
-                break
-
-    def process_contest_data(self, data: list[Dict[str, Any]]):
-        category = self.get_selected_category()
+    def on_contest_data(self, watch: ContestWatch, data: list[Dict[str, Any]], resumed: bool = False):
+        """Called on the event loop thread for every poll of a watched contest, resumed for recorded data"""
+        self.process_contest_data(watch, data)
+        watch.last_count = len(data)
+        if resumed:
+            if watch.contest_id == self.active_contest_id:
+                self.ui.post("scoreboard", self.update_stations_display)
+                self.update_status(f"Resumed from cached data ({len(data)})")
+            return
+        watch.last_update = datetime.now()
+        if watch.contest_id == self.active_contest_id:
+            self.ui.post("scoreboard", self.update_stations_display)
+            zone_rates = " ".join(f"{zone}:{watch.zone_rates[zone]}/h"
+                                  for zone in sorted(watch.include_zones) if zone in watch.zone_rates)
+            self.update_status(f"Last updated: {watch.last_update.strftime('%H:%M:%S')} ({len(data)})"
+                               f" - watching {len(self.watcher.watches)} contest(s)"
+                               + (f" - zones {zone_rates}" if zone_rates else ""))
+
+    def process_contest_data(self, watch: ContestWatch, data: list[Dict[str, Any]]):
+        category = watch.category
         logging.debug("Processing: %s id=%d stations:%d", category.categoryname, category.catid, len(data))
 
+        # index the snapshot once, only when the area filter or the per zone rates need it
+        area_ids = None
+        watch.geo = None
+        if (watch.area != AREA_ALL and watch.home_id is not None) or watch.include_zones:
+            watch.geo = GeoIndex(data)
+            area_ids = watch.geo.area_members(watch.area, watch.home_id, watch.radius_km)
+            if watch.include_zones:
+                self.update_zone_rates(watch)
+
         counter: int = 0
+        changed: List[int] = []
 
         for item in data:
-            callsign = item.get('sign', '').upper()
+            station_id = callsigns.id_for(item.get('sign', ''))
             # check is sign is in include list
-            if self.include_callsigns and callsign in self.include_callsigns:
-                self.stations.update_from_json_item(item, mark=True)
+            if station_id in watch.include_ids:
+                if watch.stations.update_from_json_item(item, mark=True, station_id=station_id):
+                    changed.append(station_id)
                 continue
 
             # do we need to filter out this item?
-            if not self.part_of_category(item, category, self.include_zones):
-                self.stations.remove_station_if_present(callsign)
+            if (area_ids is not None and station_id not in area_ids) \
+                    or not self.part_of_category(item, category, watch.include_zones):
+                if watch.stations.remove_station_if_present(station_id):
+                    watch.rules.forget(station_id)
                 continue
 
             # add to monitoring stations list
-            self.stations.update_from_json_item(item)
+            if watch.stations.update_from_json_item(item, station_id=station_id):
+                changed.append(station_id)
 
             # do we have enough stations to monitor?
             counter += 1
-            if counter >= int(self.stations_var.get() or "99999"):
+            if counter >= watch.max_stations:
                 break
 
-        self.root.after(0, self.update_stations_display)
+        logging.debug("Applied %d changed of %d monitored stations", len(changed), len(watch.stations.stations_list))
+
+        alerts = watch.rules.evaluate(watch.stations, changed)
+        if alerts:
+            self.notify(watch, alerts)
+
+    def notify(self, watch: ContestWatch, alerts: List[Alert]):
+        time_text = datetime.now().strftime('%H:%M')
+        for alert in alerts:
+            logging.warning("Alert in contest %d: %s", watch.contest_id, alert)
+            self.recent_alerts.append(f"{time_text} {alert}")
+            if self.alert_hook:
+                try:
+                    # fire and forget, the hook gets the rule name, callsign and contest id as arguments
+                    subprocess.Popen([self.alert_hook, alert.rule, alert.callsign, str(watch.contest_id)])
+                except Exception as e:
+                    logging.error("Error running alert hook %s: %s", self.alert_hook, e)
+        # the update renders all recent alerts, so a newer post replacing it loses nothing
+        self.ui.post("alert", lambda: self.alert_var.set(" | ".join(reversed(list(self.recent_alerts)))))
 
     @staticmethod
-    def part_of_category(item: Dict[str, Any], category: Category, zones: list[int]) -> bool:
+    def update_zone_rates(watch: ContestWatch):
+        if watch.rates_base is None:
+            watch.rates_base = watch.geo
+            return
+        rates = watch.geo.rates(WAZ, watch.rates_base)
+        # keep the baseline until the feed has moved on enough to measure a rate
+        if rates:
+            watch.zone_rates = rates
+            watch.rates_base = watch.geo
+
+    @staticmethod
+    def part_of_category(item: Dict[str, Any], category: Category, zones: FrozenSet[int]) -> bool:
         if not category or not item:
             return False
 
@@ -390,15 +485,29 @@ class Application:
             return False
         return True
 
+    @staticmethod
+    def set_dropdown(dropdown: ctk.CTkComboBox, values: List[str], selected: Optional[str] = None):
+        dropdown.configure(values=values)
+        if selected in values:
+            dropdown.set(selected)
+        elif values:
+            dropdown.set(values[0])
+
+    def clear_stations_display(self):
+        self.results_text.delete("1.0", "end")
+
     def update_stations_display(self):
+        watch = self.watcher.get(self.active_contest_id)
+        if not watch:
+            return
         self.results_text.delete("1.0", "end")
         self.results_text.insert("1.0", self.HEADER_TEXT, "header")
         # display each station sorted by score
-        for station in self.stations.get_stations_sorted_by_score():
+        for station in watch.stations.get_stations_sorted_by_score():
             station.add_to_scrolledtext(self.results_text)
 
     def update_status(self, message: str):
-        self.root.after(0, lambda: self.status_var.set(message))
+        self.ui.post("status", lambda: self.status_var.set(message))
 
     def start_async_tasks(self):
         """Start the async event loop in a separate thread"""
@@ -413,17 +522,37 @@ class Application:
         # Start loading contests
         asyncio.run_coroutine_threadsafe(self.load_contests(), self.loop)
 
+    def show_log(self):
+        """Show the most recent log lines kept in memory"""
+        window = ctk.CTkToplevel(self.root)
+        window.title("Log")
+        window.geometry("1200x400")
+        log_text = scrolledtext.ScrolledText(window, font=(find_font(), 12), bg="#2b2b2b", fg="#ffffff", relief="flat")
+        log_text.pack(fill="both", expand=True, padx=2, pady=2)
+        ui_stats = " ".join(f"{key}={value}" for key, value in self.ui.stats().items())
+        log_text.insert("1.0", f"UI updates: {ui_stats}\n", "header")
+        log_text.insert("end", "\n".join(ring_buffer.lines()))
+        log_text.tag_configure("header", foreground="#4fc3f7")
+        log_text.see("end")
+        log_text.configure(state="disabled")
+
     def save_config(self):
         set_config_value("Settings", "stations", self.stations_var.get())
         set_config_value("Settings", "zone", self.zone_var.get())
         set_config_value("Settings", "include", self.include_var.get())
+        set_config_value("Settings", "area", self.area_var.get())
+        set_config_value("Settings", "radius_km", self.radius_var.get())
 
     def on_closing(self):
         """Cleanup when closing the application"""
         logging.debug("Closing application")
         self.save_config()
-        self.is_monitoring = False
-        if self.current_monitor_task:
-            self.current_monitor_task.cancel()
+        self.watcher.stop()
+        self.ui.close()
+        try:
+            asyncio.run_coroutine_threadsafe(self.transfer.close(), self.loop).result(timeout=2)
+        except Exception as e:
+            logging.debug("Error closing HTTP session: %s", e)
         self.loop.call_soon_threadsafe(self.loop.stop)
         self.root.destroy()
+        shutdown_logging()
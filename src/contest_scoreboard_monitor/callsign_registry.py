@@ -0,0 +1,47 @@
+import sys
+import threading
+from typing import Dict, List, Optional
+
+
+class CallsignRegistry:
+    """Give every callsign a stable integer ID on first sight.
+
+    Raw signs as received from the feed are cached as well, so a sign seen before is resolved with a
+    single dict lookup, without being stripped and uppercased again.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._signs: List[str] = []
+        self._lock = threading.Lock()
+
+    def id_for(self, sign: str) -> int:
+        station_id = self._ids.get(sign)
+        if station_id is not None:
+            return station_id
+        with self._lock:
+            callsign = sys.intern(sign.strip().upper())
+            station_id = self._ids.get(callsign)
+            if station_id is None:
+                station_id = len(self._signs)
+                self._signs.append(callsign)
+                self._ids[callsign] = station_id
+            self._ids[sign] = station_id
+            return station_id
+
+    def find(self, sign: str) -> Optional[int]:
+        """ID of a sign already registered, without registering it."""
+        station_id = self._ids.get(sign)
+        if station_id is None:
+            station_id = self._ids.get(sign.strip().upper())
+        return station_id
+
+    def sign_for(self, station_id: int) -> str:
+        return self._signs[station_id]
+
+    def __len__(self):
+        return len(self._signs)
+
+
+# shared by all contests, a callsign keeps its ID when it shows up in another contest
+callsigns: CallsignRegistry = CallsignRegistry()
@@ -0,0 +1,145 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from src.contest_scoreboard_monitor.callsign_registry import callsigns
+
+EARTH_RADIUS_KM = 6371.0
+
+# group kinds, named after the feed fields they are built from
+WAZ = 'waz'
+ITU = 'itu'
+DXCC = 'dxcc'
+WAC = 'wac'
+
+# area filter options, relative to the home station (the first include callsign)
+AREA_ALL = 'ALL'
+AREA_RADIUS = 'WITHIN KM'
+AREA_KINDS = {'MY CQ ZONE': WAZ, 'MY ITU ZONE': ITU, 'MY DXCC': DXCC, 'MY CONTINENT': WAC}
+AREAS = [AREA_ALL] + list(AREA_KINDS) + [AREA_RADIUS]
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great circle distance (haversine)"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoIndex:
+    """Index of one scoreboard snapshot by CQ zone, ITU zone, DXCC and continent, with a lat/lon grid.
+
+    Built in a single pass over the feed, once per poll, when the area filter or zone rates need it.
+    """
+
+    def __init__(self, data: List[Dict[str, Any]], cell_deg: float = 5.0):
+        self.cell_deg: float = cell_deg
+        # time of the snapshot, the newest 'date' reported in the feed
+        self.snapshot_date: Optional[datetime] = None
+        self.groups: Dict[str, Dict[Any, List[int]]] = {WAZ: defaultdict(list), ITU: defaultdict(list),
+                                                        DXCC: defaultdict(list), WAC: defaultdict(list)}
+        self.rows: Dict[int, Dict[str, Any]] = {}
+        self.positions: Dict[int, Tuple[float, float]] = {}
+        self.grid: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        self._members: Dict[Tuple[str, Any], FrozenSet[int]] = {}
+
+        newest = ''
+        for item in data:
+            station_id = callsigns.id_for(item.get('sign', ''))
+            self.rows[station_id] = item
+            date = item.get('date')
+            if isinstance(date, str) and date > newest:
+                newest = date  # 'YYYY-MM-DD HH:MM:SS' sorts as text
+            for kind in self.groups:
+                value = item.get(kind)
+                if value is None or value == '':
+                    continue
+                self.groups[kind][value].append(station_id)
+            position = self._position(item)
+            if position:
+                self.positions[station_id] = position
+                self.grid[self._cell(*position)].append(station_id)
+
+        if newest:
+            try:
+                self.snapshot_date = datetime.strptime(newest, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+            except ValueError:
+                self.snapshot_date = None
+
+    @staticmethod
+    def _position(item: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+        try:
+            lat, lon = float(item['lat']), float(item['lon'])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if lat == 0.0 and lon == 0.0:
+            return None  # no location reported
+        return lat, lon
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int((lat + 90) // self.cell_deg), int(((lon + 180) % 360) // self.cell_deg)
+
+    def value_of(self, station_id: int, kind: str) -> Any:
+        row = self.rows.get(station_id)
+        return row.get(kind) if row else None
+
+    def members(self, kind: str, value: Any) -> FrozenSet[int]:
+        key = (kind, value)
+        if key not in self._members:
+            self._members[key] = frozenset(self.groups[kind].get(value, ()))
+        return self._members[key]
+
+    def within_km(self, lat: float, lon: float, radius_km: float) -> FrozenSet[int]:
+        """Station IDs located within radius_km of a position, only scanning nearby grid cells"""
+        lat_span = radius_km / (math.pi * EARTH_RADIUS_KM / 180)
+        cos_lat = math.cos(math.radians(min(89.9, abs(lat) + lat_span)))
+        lon_span = 180.0 if lat_span >= 90 else min(180.0, lat_span / cos_lat)
+
+        rows = range(int(max(0.0, lat - lat_span + 90) // self.cell_deg),
+                     int(min(179.999, lat + lat_span + 90) // self.cell_deg) + 1)
+        columns_count = int(360 // self.cell_deg)
+        first_column = int((lon - lon_span + 180) // self.cell_deg)
+        last_column = int((lon + lon_span + 180) // self.cell_deg)
+        columns = {c % columns_count for c in range(first_column, min(last_column, first_column + columns_count - 1) + 1)}
+
+        found = set()
+        for row in rows:
+            for column in columns:
+                for station_id in self.grid.get((row, column), ()):
+                    if distance_km(lat, lon, *self.positions[station_id]) <= radius_km:
+                        found.add(station_id)
+        return frozenset(found)
+
+    def rates(self, kind: str, previous: 'GeoIndex') -> Dict[Any, int]:
+        """QSOs per hour for every zone, DXCC or continent since a previous snapshot"""
+        if self.snapshot_date is None or previous.snapshot_date is None:
+            return {}
+        elapsed_hours = (self.snapshot_date - previous.snapshot_date).total_seconds() / 3600
+        if elapsed_hours < 1 / 60:
+            return {}  # too close together for a meaningful rate
+        rates = {}
+        for value, station_ids in self.groups[kind].items():
+            worked = 0
+            for station_id in station_ids:
+                # only stations present in both snapshots, a newcomer would count its whole log
+                before = previous.rows.get(station_id)
+                if before:
+                    worked += max(0, (self.rows[station_id].get('qtotal') or 0) - (before.get('qtotal') or 0))
+            rates[value] = int(worked / elapsed_hours)
+        return rates
+
+    def area_members(self, area: str, home_id: Optional[int], radius_km: float) -> Optional[FrozenSet[int]]:
+        """Station IDs sharing an area with the home station, None when the area can't be resolved"""
+        if area == AREA_ALL or home_id is None:
+            return None
+        if area == AREA_RADIUS:
+            position = self.positions.get(home_id)
+            return self.within_km(position[0], position[1], radius_km) if position else None
+        kind = AREA_KINDS.get(area)
+        value = self.value_of(home_id, kind) if kind else None
+        if value is None or value == '':
+            return None
+        return self.members(kind, value)
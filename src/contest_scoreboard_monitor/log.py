@@ -1,5 +1,12 @@
+import atexit
 import logging
+import queue
 import sys
+import threading
+import time
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional, Tuple
 
 LOG_FORMAT = "%(asctime)s.%(msecs)03d %(levelname)s %(filename)s %(funcName)s:%(lineno)d > %(message)s"
 
@@ -7,16 +14,98 @@ LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 '''
 Setup the logging configuration for this application.
+
+Records are put on a queue by the calling thread and written by a background listener thread,
+so a slow terminal or redirected file never stalls the asyncio or Tk threads.
 '''
 
 
+class RingBufferHandler(logging.Handler):
+    """Keep the last formatted log lines in memory so the UI can show them."""
+
+    def __init__(self, capacity: int = 500):
+        super().__init__()
+        self._lines: deque = deque(maxlen=capacity)
+        self._lines_lock = threading.Lock()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            line = self.format(record)
+            with self._lines_lock:
+                self._lines.append(line)
+        except Exception:
+            self.handleError(record)
+
+    def lines(self) -> List[str]:
+        with self._lines_lock:
+            return list(self._lines)
+
+
+class RepeatFilter(logging.Filter):
+    """Let a repeated warning or error through at most once per interval, then report how often it was dropped."""
+
+    def __init__(self, interval: float = 60.0):
+        super().__init__()
+        self.interval: float = interval
+        self._seen: Dict[Tuple[str, str], Tuple[float, int]] = {}
+        self._seen_lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+        key = (record.pathname + str(record.lineno), record.getMessage())
+        now = time.monotonic()
+        with self._seen_lock:
+            last, suppressed = self._seen.get(key, (None, 0))
+            if last is not None and now - last < self.interval:
+                self._seen[key] = (last, suppressed + 1)
+                return False
+            if len(self._seen) > 1000:
+                self._seen.clear()  # keep memory bounded when many distinct messages show up
+            self._seen[key] = (now, 0)
+        if suppressed:
+            record.msg = f"{record.msg} (repeated {suppressed} times)"
+        return True
+
+
+ring_buffer: RingBufferHandler = RingBufferHandler()
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+
 def setup_logging(level: int = logging.INFO):
+    global _listener, _queue_handler
     logger = logging.getLogger()
     logger.setLevel(level)
 
     # Avoid adding handlers multiple times if this is called repeatedly
     if not logger.handlers:
-        handler = logging.StreamHandler(sys.stdout)
         formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(formatter)
+        ring_buffer.setFormatter(formatter)
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        _queue_handler = QueueHandler(log_queue)
+        _queue_handler.addFilter(RepeatFilter())
+        logger.addHandler(_queue_handler)
+
+        _listener = QueueListener(log_queue, stream_handler, ring_buffer, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush the queued records and stop the background writer, later records are written directly."""
+    global _listener, _queue_handler
+    if _queue_handler:
+        logger = logging.getLogger()
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT))
+        # swap handlers before stopping the listener, so nothing is queued after the last flush
+        logger.addHandler(stream_handler)
+        logger.removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener:
+        _listener.stop()
+        _listener = None
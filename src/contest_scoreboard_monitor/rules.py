@@ -0,0 +1,203 @@
+import logging
+import operator
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.contest_scoreboard_monitor.station import Station
+from src.contest_scoreboard_monitor.station_data import StationData
+from src.contest_scoreboard_monitor.stations_list import StationsList
+
+'''
+Alert rules are read from the [Rules] section of the ini file, one rule per option:
+
+    [Rules]
+    overtake = score > home.score
+    high rate = delta.rate >= 200
+    10m open = delta.q10 > 0 and delta.qtotal > 5
+
+    my dxcc = dxcc == home.dxcc and delta.rate > 100
+    africa = wac == 'AF'
+
+Operands are StationData fields of the latest data (score), of the delta (delta.rate), of the home
+station, i.e. the first include callsign (home.score, home.delta.rate), numbers or quoted text.
+Text fields (dxcc, wac, sign, ...) can only be compared with == or != to text, case insensitive.
+Date fields can't be used.
+'''
+
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    '>=': operator.ge,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '<': operator.lt,
+}
+
+OPERAND = r'(\'[^\']*\'|"[^"]*"|[\w.+-]+)'
+CONDITION = re.compile(r'^\s*' + OPERAND + r'\s*(>=|<=|==|!=|>|<)\s*' + OPERAND + r'\s*$')
+
+NUMBER = 'number'
+TEXT = 'text'
+
+Operand = Callable[[Station, Optional[Station]], Any]
+
+
+@dataclass
+class Alert:
+    rule: str
+    callsign: str
+    message: str
+
+    def __str__(self):
+        return f"{self.callsign}: {self.rule} ({self.message})"
+
+
+def _compile_operand(text: str) -> Tuple[Operand, bool, str]:
+    """Compile an operand into a getter taking (station, home), also tell if it refers to the home
+    station and whether it is a number or text"""
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in '\'"':
+        literal = text[1:-1].strip().upper()
+        return (lambda station, home: literal), False, TEXT
+    try:
+        number = float(text)
+        return (lambda station, home: number), False, NUMBER
+    except ValueError:
+        pass
+
+    parts = text.split('.')
+    uses_home = parts[0] == 'home'
+    if uses_home:
+        parts = parts[1:]
+    use_delta = len(parts) == 2 and parts[0] == 'delta'
+    if use_delta:
+        parts = parts[1:]
+    if len(parts) != 1 or parts[0].startswith('_') or not hasattr(StationData, parts[0]):
+        raise ValueError(f"Unknown field: {text}")
+    field = parts[0]
+    field_type = StationData.__annotations__.get(field)
+    if field_type in (int, float):
+        kind = NUMBER
+    elif field_type is str:
+        kind = TEXT
+    else:
+        raise ValueError(f"Field can't be used in a rule: {text}")
+
+    def value(station: Optional[Station]) -> Any:
+        if station is None:
+            return None
+        data = station.delta if use_delta else station.newest()
+        result = getattr(data, field, None) if data else None
+        if kind == TEXT and result is not None:
+            return str(result).strip().upper()
+        return result
+
+    if uses_home:
+        return (lambda station, home: value(home)), True, kind
+    return (lambda station, home: value(station)), False, kind
+
+
+class Rule:
+    def __init__(self, name: str, expression: str):
+        self.name: str = name
+        self.expression: str = expression
+        self.uses_home: bool = False
+        self.enabled: bool = True
+        self._conditions: List[Tuple[Operand, Callable[[Any, Any], bool], Operand]] = []
+
+        for clause in expression.split(' and '):
+            match = CONDITION.match(clause)
+            if not match:
+                raise ValueError(f"Invalid condition '{clause}' in rule '{name}'")
+            left, left_home, left_kind = _compile_operand(match.group(1))
+            right, right_home, right_kind = _compile_operand(match.group(3))
+            if left_kind != right_kind:
+                raise ValueError(f"Can't compare {left_kind} with {right_kind} in '{clause}' of rule '{name}'")
+            if left_kind == TEXT and match.group(2) not in ('==', '!='):
+                raise ValueError(f"Text can only be compared with == or != in '{clause}' of rule '{name}'")
+            self.uses_home = self.uses_home or left_home or right_home
+            self._conditions.append((left, OPERATORS[match.group(2)], right))
+
+    def matches(self, station: Station, home: Optional[Station]) -> bool:
+        for left, compare, right in self._conditions:
+            a, b = left(station, home), right(station, home)
+            if a is None or b is None or not compare(a, b):
+                return False
+        return True
+
+    def __str__(self):
+        return f"{self.name}: {self.expression}"
+
+
+def compile_rules(definitions: Dict[str, str]) -> List[Rule]:
+    rules = []
+    for name, expression in definitions.items():
+        try:
+            rules.append(Rule(name, expression))
+        except ValueError as e:
+            logging.error("Skipping alert rule: %s", e)
+    return rules
+
+
+class RuleEngine:
+    """Evaluate alert rules on the stations that changed in a poll.
+
+    The first evaluation of a rule for a station only records its state; an alert fires when the rule
+    goes from false to true between polls, and again only after it was false in between. Rules
+    referring to the home station are also checked for every station when the home station itself
+    changed, and wait until the home station is known. Call forget() when a station leaves the list,
+    so it starts from a fresh first evaluation when it comes back.
+    """
+
+    def __init__(self, rules: List[Rule], home_id: Optional[int] = None):
+        self.rules: List[Rule] = rules
+        self.home_id: Optional[int] = home_id
+        self._home_rules: List[Rule] = [r for r in rules if r.uses_home]
+        # rule names per station ID that were evaluated, and that currently match
+        self._seen: Dict[int, Set[str]] = {}
+        self._active: Dict[int, Set[str]] = {}
+
+    def forget(self, station_id: int) -> None:
+        self._seen.pop(station_id, None)
+        self._active.pop(station_id, None)
+
+    def evaluate(self, stations: StationsList, changed: Iterable[int]) -> List[Alert]:
+        if not self.rules:
+            return []
+        home = stations.get_by_id(self.home_id) if self.home_id is not None else None
+        changed = set(changed)
+
+        checks: Dict[int, List[Rule]] = {station_id: self.rules for station_id in changed}
+        if self.home_id in changed and self._home_rules:
+            for station_id in stations.stations_list:
+                if station_id not in changed:
+                    checks[station_id] = self._home_rules
+
+        alerts = []
+        for station_id, rules in checks.items():
+            station = stations.get_by_id(station_id)
+            if not station:
+                continue
+            seen = self._seen.setdefault(station_id, set())
+            active = self._active.setdefault(station_id, set())
+            for rule in rules:
+                if not rule.enabled:
+                    continue
+                if rule.uses_home and (home is None or station_id == self.home_id):
+                    continue  # no home station yet, or no point comparing it with itself
+                try:
+                    matches = rule.matches(station, home)
+                except TypeError as e:
+                    rule.enabled = False
+                    logging.error("Disabling alert rule %s: %s", rule, e)
+                    continue
+                first = rule.name not in seen
+                seen.add(rule.name)
+                if matches:
+                    if rule.name not in active:
+                        active.add(rule.name)
+                        if not first:
+                            alerts.append(Alert(rule=rule.name, callsign=station.callsign, message=rule.expression))
+                else:
+                    active.discard(rule.name)
+        return alerts
@@ -7,24 +7,27 @@ from src.contest_scoreboard_monitor.station_data import StationData
 
 
 class Station:
-    def __init__(self, callsign):
+    def __init__(self, callsign, station_id: int = -1):
         self.callsign: str = callsign
+        self.station_id: int = station_id
         self.delta: StationData = StationData({})
         self._data_history: List[StationData] = []
         self.mark: bool = False
         self._max_history: int = 10
         self.range: int = 10
 
-    def update_from_json_item(self, json_item: Dict[str, Any]):
+    def update_from_json_item(self, json_item: Dict[str, Any]) -> bool:
         try:
             new_data = StationData(json_item)
             if new_data and self.newest() and new_data.date == self.newest().date:
-                return  # ignore duplicate data
+                return False  # ignore duplicate data
             self._data_history.append(new_data)
             self.drop_old_data()
             self.update_delta()
+            return True
         except Exception as e:
             logging.error("Error updating station from JSON item: %s", e)
+            return False
 
     def newest(self) -> Optional[StationData]:
         if not self._data_history or len(self._data_history) < 1:
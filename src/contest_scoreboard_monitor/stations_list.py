@@ -1,42 +1,74 @@
 import logging
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 
+from src.contest_scoreboard_monitor.callsign_registry import callsigns
 from src.contest_scoreboard_monitor.station import Station
 
 
 class StationsList:
     def __init__(self):
-        self.stations_list = {}
+        # stations keyed by their callsign registry ID
+        self.stations_list: Dict[int, Station] = {}
+        # raw (date, qtotal, score) of the last applied item per station, to skip unchanged rows cheaply
+        self._fingerprints: Dict[int, Tuple[Any, Any, Any]] = {}
+
+    @staticmethod
+    def fingerprint(json_item: Dict[str, Any]) -> Tuple[Any, Any, Any]:
+        return json_item.get('date'), json_item.get('qtotal'), json_item.get('score')
 
     def get(self, callsign: str) -> Station | None:
-        return self.stations_list.get(callsign)
+        station_id = callsigns.find(callsign)
+        return self.stations_list.get(station_id) if station_id is not None else None
+
+    def get_by_id(self, station_id: int) -> Station | None:
+        return self.stations_list.get(station_id)
 
-    # update from a single JSON data object dict
-    def update_from_json_item(self, json_item: Dict[str, Any], mark: bool = False):
+    # update from a single JSON data object dict, returns True when the item changed the station
+    def update_from_json_item(self, json_item: Dict[str, Any], mark: bool = False,
+                              station_id: Optional[int] = None) -> bool:
         try:
-            callsign = json_item.get('sign', 'ERROR')
-            station: Station = self.get(callsign)
+            if station_id is None:
+                station_id = callsigns.id_for(json_item.get('sign', 'ERROR'))
+            fingerprint = self.fingerprint(json_item)
+            station: Station = self.stations_list.get(station_id)
+            if station and self._fingerprints.get(station_id) == fingerprint:
+                station.mark = mark
+                return False  # unchanged since the previous poll, skip decoding
             if not station:
-                station: Station = Station(callsign=callsign)
-                self.stations_list[callsign] = station
-            station.update_from_json_item(json_item)
+                station: Station = Station(callsign=callsigns.sign_for(station_id), station_id=station_id)
+                self.stations_list[station_id] = station
+            self._fingerprints[station_id] = fingerprint
             station.mark = mark
+            return station.update_from_json_item(json_item)
         except Exception as e:
             logging.error("Error updating station from JSON item: %s", e)
+            return False
 
-    def remove_station_if_present(self, callsign: str):
-        if callsign in self.stations_list:
-            self.stations_list.pop(callsign)
+    def remove_station_if_present(self, station_id: int) -> bool:
+        if station_id in self.stations_list:
+            self.stations_list.pop(station_id)
+            self._fingerprints.pop(station_id, None)
+            return True
+        return False
 
     def get_stations(self) -> list[Station]:
         return list(self.stations_list.values())
 
     def get_stations_sorted_by_score(self) -> list[Station]:
+        return [station for _, station in self._sorted_by_score()]
+
+    def ranking(self) -> list[int]:
+        """Station IDs sorted by score, highest first"""
+        return [station_id for station_id, _ in self._sorted_by_score()]
+
+    def _sorted_by_score(self) -> list[tuple[int, Station]]:
+        # sort a snapshot, the poll thread may remove stations while the Tk thread redraws
         return sorted(
-            self.stations_list.values(),
-            key=lambda s: s.newest().score if s.newest() else 0,
+            list(self.stations_list.items()),
+            key=lambda item: item[1].newest().score if item[1].newest() else 0,
             reverse=True
         )
 
     def clear(self):
         self.stations_list = {}
+        self._fingerprints = {}
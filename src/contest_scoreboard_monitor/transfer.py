@@ -0,0 +1,187 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import zlib
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import aiohttp
+
+from src.contest_scoreboard_monitor.inpersonate import inpersonate_browser_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from compression import zstd  # Python 3.14+
+    zstd_stdlib = True
+except ImportError:
+    zstd_stdlib = False
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
+CACHE_DIR = 'contest_scoreboard_monitor_cache'
+
+
+def _decode_deflate(data: bytes) -> bytes:
+    try:
+        return zlib.decompress(data)
+    except zlib.error:
+        # some servers send raw deflate without the zlib header
+        return zlib.decompress(data, -zlib.MAX_WBITS)
+
+
+def _decode_zstd(data: bytes) -> bytes:
+    if zstd_stdlib:
+        return zstd.decompress(data)
+    # zstandard: frames sent by servers usually omit the content size
+    return zstd.ZstdDecompressor().decompressobj().decompress(data)
+
+
+def _decoders() -> Dict[str, Callable[[bytes], bytes]]:
+    decoders: Dict[str, Callable[[bytes], bytes]] = {
+        'gzip': gzip.decompress,
+        'deflate': _decode_deflate,
+    }
+    if brotli:
+        decoders['br'] = brotli.decompress
+    if zstd:
+        decoders['zstd'] = _decode_zstd
+    return decoders
+
+
+class PayloadTransfer:
+    """Fetch JSON payloads with negotiated compression and keep the last payload of each URL on disk.
+
+    All requests share one HTTP session and connection pool, created on first use in the event loop.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_connections: int = 4):
+        self.cache_dir: str = cache_dir
+        self.max_connections: int = max_connections
+        self.decoders = _decoders()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.wire_bytes_total: int = 0
+        self.decoded_bytes_total: int = 0
+
+    def request_headers(self) -> Dict[str, str]:
+        """Browser headers, advertising only the encodings we are able to decode."""
+        headers = inpersonate_browser_headers()
+        advertised = [e.strip() for e in headers.get('Accept-Encoding', '').split(',') if e.strip()]
+        supported = [e for e in advertised if e in self.decoders]
+        unsupported = [e for e in advertised if e not in self.decoders]
+        if unsupported:
+            logging.debug("Not advertising encodings without a decoder: %s", unsupported)
+        headers['Accept-Encoding'] = ', '.join(supported) if supported else 'identity'
+        return headers
+
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(ssl=False, limit=self.max_connections)
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.request_headers(),
+                                                  auto_decompress=False)
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def fetch_json(self, url: str) -> Optional[Any]:
+        """Fetch and decode a JSON payload, answering from the disk cache when the server reports no change."""
+        etag, last_modified = await asyncio.to_thread(self._read_validators, url)
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        async with self.session().get(url, headers=headers, timeout=30) as response:
+            if response.status == 304:
+                logging.info("Not modified: %s (0 bytes on the wire)", url)
+                return await self.load_cached(url)
+            response.raise_for_status()
+            raw = await response.read()
+            encoding = response.headers.get('Content-Encoding', 'identity')
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+
+        decoded = self.decode(raw, encoding)
+        self.wire_bytes_total += len(raw)
+        self.decoded_bytes_total += len(decoded)
+        logging.info("Fetched %s: %s %d bytes on the wire, %d bytes decoded (%.0f%%)",
+                     url, encoding, len(raw), len(decoded), 100 * len(raw) / len(decoded) if decoded else 100)
+
+        data = json.loads(decoded)
+        await asyncio.to_thread(self._write_cache, url, decoded, etag, last_modified)
+        return data
+
+    def decode(self, raw: bytes, content_encoding: str) -> bytes:
+        # encodings are listed in the order they were applied, undo them in reverse
+        encodings = [e.strip().lower() for e in content_encoding.split(',') if e.strip()]
+        data = raw
+        for encoding in reversed(encodings):
+            if encoding == 'identity':
+                continue
+            decoder = self.decoders.get(encoding)
+            if not decoder:
+                raise ValueError(f"Unsupported content encoding: {encoding}")
+            data = decoder(data)
+        return data
+
+    async def load_cached(self, url: str) -> Optional[Any]:
+        """Return the last payload stored on disk for this URL, if any."""
+        return await asyncio.to_thread(self._read_cache, url)
+
+    def _cache_paths(self, url: str) -> Tuple[str, str]:
+        name = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, name)
+        return base + '.json.gz', base + '.meta.json'
+
+    def _read_validators(self, url: str) -> Tuple[Optional[str], Optional[str]]:
+        payload_path, meta_path = self._cache_paths(url)
+        if not os.path.exists(payload_path) or not os.path.exists(meta_path):
+            return None, None
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            return meta.get('etag'), meta.get('last_modified')
+        except Exception as e:
+            logging.warning("Error reading cache metadata for %s: %s", url, e)
+            return None, None
+
+    def _read_cache(self, url: str) -> Optional[Any]:
+        payload_path, _ = self._cache_paths(url)
+        if not os.path.exists(payload_path):
+            return None
+        try:
+            with gzip.open(payload_path, 'rb') as f:
+                return json.loads(f.read())
+        except Exception as e:
+            logging.warning("Error reading cached payload for %s: %s", url, e)
+            return None
+
+    def _write_cache(self, url: str, decoded: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+        payload_path, meta_path = self._cache_paths(url)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with gzip.open(payload_path + '.tmp', 'wb') as f:
+                f.write(decoded)
+            os.replace(payload_path + '.tmp', payload_path)
+            with open(meta_path + '.tmp', 'w') as f:
+                json.dump({'url': url, 'etag': etag, 'last_modified': last_modified}, f)
+            os.replace(meta_path + '.tmp', meta_path)
+        except Exception as e:
+            logging.warning("Error writing cached payload for %s: %s", url, e)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "wire_bytes": self.wire_bytes_total,
+            "decoded_bytes": self.decoded_bytes_total,
+        }
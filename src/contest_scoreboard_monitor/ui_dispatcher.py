@@ -0,0 +1,81 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict
+
+
+class UiDispatcher:
+    """Coalesce UI updates by key and run them on the Tk thread within a frame budget.
+
+    Updates posted with the same key before the next flush replace each other, so only the
+    most recent status, scoreboard or dropdown update is drawn. A replaced update counts as dropped,
+    an update added to an already scheduled flush counts as merged.
+    """
+
+    def __init__(self, root, frame_budget_ms: int = 100):
+        self.root = root
+        self.frame_budget_ms: int = max(0, frame_budget_ms)
+        self.merged_count: int = 0
+        self.dropped_count: int = 0
+        self.flush_count: int = 0
+        self._pending: Dict[str, Callable[[], None]] = {}
+        self._lock = threading.Lock()
+        self._flush_scheduled: bool = False
+        self._last_flush: float = 0.0
+        self._closed: bool = False
+
+    def post(self, key: str, callback: Callable[[], None]) -> None:
+        """Queue a UI update, replacing any pending update with the same key. Safe to call from any thread."""
+        with self._lock:
+            if self._closed:
+                self.dropped_count += 1
+                return
+            if key in self._pending:
+                self.dropped_count += 1  # superseded before it was drawn
+            self._pending[key] = callback
+            if self._flush_scheduled:
+                self.merged_count += 1  # rides along with the flush already scheduled
+                return
+            self._flush_scheduled = True
+            elapsed_ms = (time.monotonic() - self._last_flush) * 1000
+            delay_ms = int(max(0.0, self.frame_budget_ms - elapsed_ms))
+        try:
+            self.root.after(delay_ms, self._flush)
+        except Exception as e:
+            logging.error("Error scheduling UI update: %s", e)
+            with self._lock:
+                self._flush_scheduled = False
+
+    def _flush(self) -> None:
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            self._flush_scheduled = False
+            self._last_flush = time.monotonic()
+            self.flush_count += 1
+            report = self.flush_count % 100 == 0
+        if report and logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug("UI dispatcher: %s", self.stats())
+        for key, callback in pending.items():
+            try:
+                callback()
+            except Exception as e:
+                logging.error("Error running UI update '%s': %s", key, e)
+
+    def close(self) -> None:
+        """Stop accepting updates and drop anything still pending."""
+        with self._lock:
+            self._closed = True
+            self.dropped_count += len(self._pending)
+            self._pending = {}
+        logging.debug("UI dispatcher closed: %d flushes, %d merged, %d dropped",
+                      self.flush_count, self.merged_count, self.dropped_count)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "flushes": self.flush_count,
+                "merged": self.merged_count,
+                "dropped": self.dropped_count,
+                "pending": len(self._pending),
+            }
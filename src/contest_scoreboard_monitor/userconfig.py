@@ -1,7 +1,7 @@
 import configparser
 import logging
 import os
-from typing import Any
+from typing import Any, Dict
 
 CONFIG_FILE = 'contest_scoreboard_monitor.ini'
 config: configparser.ConfigParser = configparser.ConfigParser()
@@ -25,6 +25,13 @@ def get_config_value(section: str, option: str, default: Any = None) -> Any:
         return default
 
 
+def get_config_section(section: str) -> Dict[str, str]:
+    """Get all options of a section, empty when the section is missing."""
+    if not config.has_section(section):
+        return {}
+    return dict(config.items(section))
+
+
 def set_config_value(section: str, option: str, value: Any) -> None:
     """Set a configuration value and save to the ini file."""
     if not config.has_section(section):
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Optional, Set
+
+from src.contest_scoreboard_monitor.category import Category
+from src.contest_scoreboard_monitor.geo_index import AREA_ALL, GeoIndex
+from src.contest_scoreboard_monitor.rules import RuleEngine
+from src.contest_scoreboard_monitor.stations_list import StationsList
+
+
+class ContestWatch:
+    """A monitored contest with its own filters and station registry."""
+
+    def __init__(self, contest_id: int, category: Category, include_zones: FrozenSet[int],
+                 include_ids: FrozenSet[int], max_stations: int, area: str = AREA_ALL,
+                 home_id: Optional[int] = None, radius_km: int = 0):
+        self.contest_id: int = contest_id
+        self.url: str = f"https://contest.run/api/displayscore/{contest_id}"
+        self.category: Category = category
+        self.include_zones: FrozenSet[int] = include_zones
+        # callsign registry IDs of the stations always shown
+        self.include_ids: FrozenSet[int] = include_ids
+        self.max_stations: int = max_stations
+        self.area: str = area
+        self.home_id: Optional[int] = home_id
+        self.radius_km: int = radius_km
+        self.geo: Optional[GeoIndex] = None
+        # snapshot the zone rates are measured against
+        self.rates_base: Optional[GeoIndex] = None
+        self.zone_rates: Dict[int, int] = {}
+        self.rules: RuleEngine = RuleEngine([], home_id)
+        self.stations: StationsList = StationsList()
+        self.last_update: Optional[datetime] = None
+        self.last_count: int = 0
+        self.next_poll: float = 0.0
+        self.polling: bool = False
+        self.resumed: bool = False
+
+    def __str__(self):
+        return f"contest {self.contest_id} ({self.category.categoryname if self.category else 'no category'})"
+
+
+class ContestWatcher:
+    """Poll several contests from one scheduler task, spreading the polls over the update interval.
+
+    A new contest is first primed from the recorded payload returned by `resume`, if any, then polled.
+    `on_data` is told whether the data was resumed from that recording or freshly fetched.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, fetch: Callable[[str], Awaitable[Optional[Any]]],
+                 on_data: Callable[[ContestWatch, Any, bool], None],
+                 resume: Optional[Callable[[str], Awaitable[Optional[Any]]]] = None, interval: int = 60):
+        self.loop = loop
+        self.fetch = fetch
+        self.on_data = on_data
+        self.resume = resume
+        self.interval: int = interval
+        self.watches: Dict[int, ContestWatch] = {}
+        self._polls: Set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def get(self, contest_id: Optional[int]) -> Optional[ContestWatch]:
+        return self.watches.get(contest_id)
+
+    def is_watching(self, contest_id: Optional[int]) -> bool:
+        return contest_id in self.watches
+
+    # add, remove and stop may be called from the Tk thread
+    def add(self, watch: ContestWatch) -> None:
+        logging.debug("Start watching %s", watch)
+        watch.next_poll = time.monotonic()  # first poll right away
+        self.watches[watch.contest_id] = watch
+        self.loop.call_soon_threadsafe(self._wake)
+
+    def remove(self, contest_id: int) -> None:
+        watch = self.watches.pop(contest_id, None)
+        if watch:
+            logging.debug("Stop watching %s", watch)
+        self.loop.call_soon_threadsafe(self._wake)
+
+    def stop(self) -> None:
+        self.watches.clear()
+        self.loop.call_soon_threadsafe(self._cancel)
+
+    def _wake(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        self._wakeup.set()
+
+    def _cancel(self) -> None:
+        if self._task:
+            self._task.cancel()
+        for task in self._polls:
+            task.cancel()
+
+    async def run(self) -> None:
+        try:
+            while True:
+                now = time.monotonic()
+                for watch in list(self.watches.values()):
+                    if not watch.polling and watch.next_poll <= now:
+                        watch.polling = True
+                        task = asyncio.create_task(self._poll(watch))
+                        self._polls.add(task)
+                        task.add_done_callback(self._polls.discard)
+
+                waiting = [w.next_poll for w in list(self.watches.values()) if not w.polling]
+                timeout = max(0.0, min(waiting) - now) if waiting else None
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            logging.debug("async cancelled error caught, stopping contest watcher")
+
+    async def _poll(self, watch: ContestWatch) -> None:
+        try:
+            if self.resume and not watch.resumed:
+                watch.resumed = True
+                cached = await self.resume(watch.url)
+                if cached and self.watches.get(watch.contest_id) is watch:
+                    logging.debug("Resuming %s from %d cached entries.", watch, len(cached))
+                    self.on_data(watch, cached, True)
+
+            data = await self.fetch(watch.url)
+            logging.debug("Received data for %s: %d entries.", watch, len(data) if data else 0)
+            # the contest may have been removed while the request was in flight
+            if data and self.watches.get(watch.contest_id) is watch:
+                self.on_data(watch, data, False)
+        except Exception as e:
+            logging.error("Error polling %s: %s", watch, e)
+        finally:
+            watch.polling = False
+            self._schedule_next(watch)
+            self._wakeup.set()
+
+    def _schedule_next(self, watch: ContestWatch) -> None:
+        # keep at least interval / n seconds between polls of different contests so they don't burst together
+        spacing = self.interval / max(1, len(self.watches))
+        next_poll = time.monotonic() + self.interval
+        others = [w.next_poll for w in list(self.watches.values()) if w is not watch]
+        for _ in range(len(others)):
+            if not any(abs(other - next_poll) < spacing for other in others):
+                break
+            next_poll += spacing
+        watch.next_poll = next_poll